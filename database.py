@@ -1,24 +1,154 @@
+"""SQLite storage for blog posts.
+
+For bulk imports never loop execute() per row; use bulk_insert_posts(),
+which runs a single executemany() inside one transaction.
+"""
+import json
+import re
 import sqlite3
-from datetime import datetime
-from typing import List, Optional
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from itertools import starmap
+from typing import Callable, List, Optional
 from pathlib import Path
+from markupsafe import escape
 from models import Post
 
 DATABASE_PATH = Path("blog.db")
 
-
-def get_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
+# Stored in PRAGMA user_version; bump it when existing rows need a one-off
+# rewrite on startup (see _migrate_data)
+SCHEMA_VERSION = 4
+
+# Registered instead of relying on sqlite3's default timestamp converter,
+# which is deprecated as of Python 3.12
+sqlite3.register_converter('timestamp', lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter('json', json.loads)
+
+# One long-lived connection per thread, reused by every helper on that
+# thread. FastAPI runs the handlers in its threadpool, and separate
+# connections let those reads proceed concurrently under WAL. Connections run
+# in autocommit mode (isolation_level=None), so single statements need no
+# commit(); writers are serialized by _WRITE_LOCK (re-entrant, so
+# transactions can nest).
+_local = threading.local()
+_WRITE_LOCK = threading.RLock()
+
+# Per-connection tuning: WAL lets readers run alongside a writer and, with
+# synchronous=NORMAL, only fsyncs on checkpoint instead of on every commit.
+_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-64000',  # 64MB page cache
+    'PRAGMA mmap_size=268435456',  # 256MB
+    'PRAGMA foreign_keys=ON',
+)
+
+# Columns in Post field order, so a row can be unpacked straight into Post().
+# sqlite3 converts values while fetching: created_at through its TIMESTAMP
+# declared type, media_files through the "[json]" column-name hint.
+_POST_COLUMNS = (
+    "id, title, category, color, size, COALESCE(excerpt, ''), content, created_at, read_time, "
+    "COALESCE(markdown_content, ''), COALESCE(title_html, ''), COALESCE(category_html, ''), "
+    "COALESCE(excerpt_html, ''), COALESCE(formatted_date, ''), COALESCE(formatted_date_long, ''), "
+    "COALESCE(media_files, '[]') AS \"media_files [json]\""
+)
+
+# Hot-path SQL kept as module constants: sqlite3 reuses a prepared statement
+# only when the SQL text is identical, so every caller shares these.
+_SQL_GET_ALL = f'SELECT {_POST_COLUMNS} FROM posts ORDER BY created_at DESC, id DESC'
+_SQL_GET_BY_ID = f'SELECT {_POST_COLUMNS} FROM posts WHERE id = ?'
+_SQL_LATEST = f'SELECT {_POST_COLUMNS} FROM posts ORDER BY created_at DESC, id DESC LIMIT 1'
+_SQL_FIRST_PAGE = f'SELECT {_POST_COLUMNS} FROM posts ORDER BY created_at DESC, id DESC LIMIT ?'
+_SQL_PAGE_BEFORE = (
+    f'SELECT {_POST_COLUMNS} FROM posts WHERE (created_at, id) < (?, ?) '
+    'ORDER BY created_at DESC, id DESC LIMIT ?'
+)
+_SQL_COUNT = 'SELECT COUNT(*) FROM posts'
+_SQL_INSERT = '''
+    INSERT INTO posts (title, category, color, size, excerpt, content, markdown_content, media_files, read_time,
+                       title_html, category_html, excerpt_html, created_at, formatted_date, formatted_date_long)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+_SQL_UPDATE = '''
+    UPDATE posts 
+    SET title = ?, 
+        category = ?, 
+        color = ?, 
+        size = ?, 
+        excerpt = ?, 
+        content = ?,
+        markdown_content = ?,
+        media_files = ?, 
+        read_time = ?,
+        title_html = ?,
+        category_html = ?,
+        excerpt_html = ?,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE id = ?
+'''
+_SQL_DELETE = 'DELETE FROM posts WHERE id = ?'
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_WORD_RE = re.compile(r'\S+')
+
+# INSERT/UPDATE ... RETURNING (SQLite 3.35+) hands back the written row, so
+# create_post/update_post skip the follow-up SELECT.
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+_SQL_INSERT_RETURNING = f'{_SQL_INSERT} RETURNING {_POST_COLUMNS}'
+_SQL_UPDATE_RETURNING = f'{_SQL_UPDATE} RETURNING {_POST_COLUMNS}'
+
+
+def get_connection() -> sqlite3.Connection:
+    """Get this thread's database connection, opening it on first use"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(
+            DATABASE_PATH,
+            isolation_level=None,
+            cached_statements=256,
+            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+        )
+        for pragma in _PRAGMAS:
+            conn.execute(pragma)
+        _local.conn = conn
     return conn
 
 
-def init_db():
-    """Initialize database with tables"""
+@contextmanager
+def _transaction():
+    """Run several writes as a single transaction"""
     conn = get_connection()
-    cursor = conn.cursor()
-    
+    with _WRITE_LOCK:
+        if conn.in_transaction:
+            # Nested in an outer transaction on this thread, which commits
+            yield conn
+            return
+        conn.execute('BEGIN')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+
+def init_db(render_markdown: Callable[[str], str]):
+    """Initialize database with tables
+
+    render_markdown is used to re-render stored HTML from the markdown
+    source when the schema version moves forward.
+    """
+    with _transaction() as conn:
+        cursor = conn.cursor()
+        _create_schema(cursor)
+        _migrate_data(cursor, render_markdown)
+
+
+def _create_schema(cursor):
+    """Create tables, run migrations and seed sample posts"""
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS posts (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -29,37 +159,91 @@ def init_db():
             excerpt TEXT DEFAULT '',
             content TEXT NOT NULL,
             markdown_content TEXT DEFAULT '',
-            media_files TEXT DEFAULT '',
+            media_files TEXT DEFAULT '[]',
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            read_time TEXT DEFAULT '1 min read'
+            read_time TEXT DEFAULT '1 min read',
+            title_html TEXT DEFAULT '',
+            category_html TEXT DEFAULT '',
+            excerpt_html TEXT DEFAULT '',
+            formatted_date TEXT DEFAULT '',
+            formatted_date_long TEXT DEFAULT ''
         )
     ''')
     
-    # Add markdown_content column if it doesn't exist (migration)
-    try:
-        cursor.execute('ALTER TABLE posts ADD COLUMN markdown_content TEXT DEFAULT ""')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    
-    # Add updated_at column if it doesn't exist (migration)
-    try:
-        cursor.execute('ALTER TABLE posts ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
+    # Add columns missing from older databases (migration)
+    columns = {row[1] for row in cursor.execute('PRAGMA table_info(posts)')}
+    if 'markdown_content' not in columns:
+        cursor.execute("ALTER TABLE posts ADD COLUMN markdown_content TEXT DEFAULT ''")
+    if 'updated_at' not in columns:
+        # ALTER TABLE can't add a CURRENT_TIMESTAMP default, so backfill instead
+        cursor.execute('ALTER TABLE posts ADD COLUMN updated_at TIMESTAMP')
+        cursor.execute('UPDATE posts SET updated_at = created_at')
+    for column in ('title_html', 'category_html', 'excerpt_html', 'formatted_date', 'formatted_date_long'):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE posts ADD COLUMN {column} TEXT DEFAULT ''")
     
-    conn.commit()
+    # Serves the newest-first listing without a sort; id breaks ties between
+    # posts created within the same second
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_posts_created_at ON posts(created_at DESC, id DESC)')
     
     # Add sample posts if table is empty
     cursor.execute('SELECT COUNT(*) FROM posts')
     if cursor.fetchone()[0] == 0:
-        _insert_sample_posts(cursor)
-        conn.commit()
+        _insert_sample_posts()
+
+
+def _migrate_data(cursor, render_markdown: Callable[[str], str]):
+    """Bring existing rows up to SCHEMA_VERSION, once per database file"""
+    cursor.execute('PRAGMA user_version')
+    version = cursor.fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+    
+    if version < 1:
+        # Version 1: content always holds the HTML rendered from
+        # markdown_content, so read paths never need to run the parser
+        cursor.execute("SELECT id, markdown_content FROM posts WHERE markdown_content != ''")
+        rows = cursor.fetchall()
+        cursor.executemany(
+            'UPDATE posts SET content = ? WHERE id = ?',
+            [(render_markdown(markdown), post_id) for post_id, markdown in rows]
+        )
     
-    conn.close()
+    if version < 2:
+        # Version 2: media_files holds a JSON array instead of a
+        # comma-separated string
+        cursor.execute("SELECT id, media_files FROM posts WHERE NOT json_valid(COALESCE(media_files, ''))")
+        rows = cursor.fetchall()
+        cursor.executemany(
+            'UPDATE posts SET media_files = ? WHERE id = ?',
+            [(json.dumps([f.strip() for f in (media or '').split(',') if f.strip()]), post_id) for post_id, media in rows]
+        )
+    
+    if version < 3:
+        # Version 3: HTML-escaped copies of title, category and excerpt are
+        # stored next to them, so pages don't escape on every render
+        cursor.execute('SELECT id, title, category, excerpt FROM posts')
+        rows = cursor.fetchall()
+        cursor.executemany(
+            'UPDATE posts SET title_html = ?, category_html = ?, excerpt_html = ? WHERE id = ?',
+            [(*_html_fields(title, category, excerpt), post_id) for post_id, title, category, excerpt in rows]
+        )
+    
+    if version < 4:
+        # Version 4: display dates are stored as text, so listings don't
+        # strftime every card
+        cursor.execute('SELECT id, created_at FROM posts')
+        rows = cursor.fetchall()
+        cursor.executemany(
+            'UPDATE posts SET formatted_date = ?, formatted_date_long = ? WHERE id = ?',
+            [(*_date_fields(created_at)[1:], post_id) for post_id, created_at in rows]
+        )
+    
+    cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
 
 
-def _insert_sample_posts(cursor):
+def _insert_sample_posts():
     """Insert sample posts for demo"""
     sample_posts = [
         (
@@ -95,7 +279,7 @@ This approach has several benefits:
 - Better SEO out of the box
 - Simpler mental model
 - Works with any backend language""",
-            "",
+            "[]",
             "5 min read"
         ),
         (
@@ -123,7 +307,7 @@ The cyberpunk aesthetic, popularized by movies and games, has influenced modern
 - Use dark backgrounds to make colors pop
 - Add subtle glow effects with box-shadow
 - Limit your neon palette to maintain hierarchy""",
-            "",
+            "[]",
             "3 min read"
         ),
         (
@@ -148,59 +332,93 @@ display: flex;
 align-items: center;
 justify-content: center;
 ```""",
-            "",
+            "[]",
             "2 min read"
         ),
     ]
     
-    for post in sample_posts:
-        cursor.execute('''
-            INSERT INTO posts (title, category, color, size, excerpt, content, markdown_content, media_files, read_time)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', post)
+    bulk_insert_posts(sample_posts)
+
+
+def bulk_insert_posts(rows: List[tuple]):
+    """Insert many posts in one transaction
+
+    Each row is (title, category, color, size, excerpt, content,
+    markdown_content, media_files, read_time), with media_files already
+    encoded as a JSON array. Categories are uppercased, as create_post does.
+    """
+    dates = _date_fields(_now())
+    params = []
+    for title, category, *rest in rows:
+        category = category.upper()
+        params.append((title, category, *rest, *_html_fields(title, category, rest[2]), *dates))
+    with _transaction() as conn:
+        conn.executemany(_SQL_INSERT, params)
+
+
+def _html_fields(title: str, category: str, excerpt: Optional[str]) -> tuple:
+    """HTML-escaped title, category and excerpt, computed once at write time"""
+    return str(escape(title)), str(escape(category)), str(escape(excerpt or ''))
+
+
+def _now() -> datetime:
+    """Current UTC time to the second, matching SQLite's CURRENT_TIMESTAMP"""
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+def _date_fields(created_at: datetime) -> tuple:
+    """created_at as stored, plus its short and long display forms"""
+    return created_at.isoformat(sep=' '), created_at.strftime("%b %d, %Y"), created_at.strftime("%B %d, %Y")
 
 
 def _row_to_post(row) -> Post:
-    """Convert database row to Post object"""
-    # Handle the case where markdown_content might not exist in old rows
-    markdown_content = ""
-    try:
-        markdown_content = row['markdown_content'] or ""
-    except (IndexError, KeyError):
-        pass
-    
-    return Post(
-        id=row['id'],
-        title=row['title'],
-        category=row['category'],
-        color=row['color'],
-        size=row['size'],
-        excerpt=row['excerpt'] or '',
-        content=row['content'],
-        markdown_content=markdown_content,
-        media_files=row['media_files'] or '',
-        created_at=datetime.fromisoformat(row['created_at']) if isinstance(row['created_at'], str) else row['created_at'],
-        read_time=row['read_time']
-    )
+    """Convert a database row (selected as _POST_COLUMNS) to Post object"""
+    return Post(*row)
+
+
+def _read_time(content: str) -> str:
+    """Estimate read time at ~200 words per minute"""
+    # Counting regex matches avoids building a list of every word the way
+    # str.split() does; tags are blanked out first so markup isn't counted
+    word_count = sum(1 for _ in _WORD_RE.finditer(_TAG_RE.sub(' ', content)))
+    return f"{max(1, word_count // 200)} min read"
 
 
 def get_all_posts() -> List[Post]:
-    """Get all posts sorted by date (newest first)"""
+    """Get all posts sorted by date (newest first); pages should use get_posts_page"""
+    return list(starmap(Post, get_connection().execute(_SQL_GET_ALL)))
+
+
+def get_posts_page(
+    before: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    limit: int = 20
+) -> List[Post]:
+    """Get one page of posts (newest first), starting after the (before, before_id) cursor"""
     conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM posts ORDER BY created_at DESC')
-    rows = cursor.fetchall()
-    conn.close()
-    return [_row_to_post(row) for row in rows]
+    if before is None or before_id is None:
+        cursor = conn.execute(_SQL_FIRST_PAGE, (limit,))
+    else:
+        # Keyset pagination: walks idx_posts_created_at instead of skipping OFFSET rows
+        # created_at is stored as naive UTC, so an aware cursor is converted
+        # rather than having its offset dropped
+        if before.tzinfo is not None:
+            before = before.astimezone(timezone.utc).replace(tzinfo=None)
+        cursor_key = before.isoformat(sep=' ')
+        cursor = conn.execute(_SQL_PAGE_BEFORE, (cursor_key, before_id, limit))
+    # starmap calls Post(*row) from C while iterating the cursor directly,
+    # with no per-row Python frame and no intermediate fetchall() list
+    return list(starmap(Post, cursor))
+
+
+def count_posts() -> int:
+    """Get the total number of posts"""
+    return get_connection().execute(_SQL_COUNT).fetchone()[0]
 
 
 def get_post_by_id(post_id: int) -> Optional[Post]:
     """Get a specific post by ID"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM posts WHERE id = ?', (post_id,))
-    row = cursor.fetchone()
-    conn.close()
+    row = get_connection().execute(_SQL_GET_BY_ID, (post_id,)).fetchone()
     
     if row:
         return _row_to_post(row)
@@ -209,11 +427,7 @@ def get_post_by_id(post_id: int) -> Optional[Post]:
 
 def get_latest_post() -> Optional[Post]:
     """Get the most recent post"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM posts ORDER BY created_at DESC LIMIT 1')
-    row = cursor.fetchone()
-    conn.close()
+    row = get_connection().execute(_SQL_LATEST).fetchone()
     
     if row:
         return _row_to_post(row)
@@ -232,23 +446,22 @@ def create_post(
 ) -> Post:
     """Create a new post"""
     # Calculate read time based on content
-    word_count = len(content.split())
-    read_time = f"{max(1, word_count // 200)} min read"
-    
-    # Convert media list to comma-separated string
-    media_str = ','.join(media_files)
+    read_time = _read_time(content)
     
-    conn = get_connection()
-    cursor = conn.cursor()
+    # Store media list as a JSON array
+    media_str = json.dumps(media_files)
     
-    cursor.execute('''
-        INSERT INTO posts (title, category, color, size, excerpt, content, markdown_content, media_files, read_time)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (title, category.upper(), color, size, excerpt, content, markdown_content, media_str, read_time))
+    category = category.upper()
+    params = (
+        title, category, color, size, excerpt, content, markdown_content, media_str, read_time,
+        *_html_fields(title, category, excerpt), *_date_fields(_now())
+    )
     
-    post_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    conn = get_connection()
+    with _WRITE_LOCK:
+        if _HAS_RETURNING:
+            return _row_to_post(conn.execute(_SQL_INSERT_RETURNING, params).fetchone())
+        post_id = conn.execute(_SQL_INSERT, params).lastrowid
     
     return get_post_by_id(post_id)
 
@@ -266,32 +479,23 @@ def update_post(
 ) -> Optional[Post]:
     """Update an existing post"""
     # Calculate read time
-    word_count = len(content.split())
-    read_time = f"{max(1, word_count // 200)} min read"
+    read_time = _read_time(content)
     
-    # Convert media list to comma-separated string
-    media_str = ','.join(media_files)
+    # Store media list as a JSON array
+    media_str = json.dumps(media_files)
     
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        UPDATE posts 
-        SET title = ?, 
-            category = ?, 
-            color = ?, 
-            size = ?, 
-            excerpt = ?, 
-            content = ?,
-            markdown_content = ?,
-            media_files = ?, 
-            read_time = ?,
-            updated_at = CURRENT_TIMESTAMP
-        WHERE id = ?
-    ''', (title, category.upper(), color, size, excerpt, content, markdown_content, media_str, read_time, post_id))
+    category = category.upper()
+    params = (
+        title, category, color, size, excerpt, content, markdown_content, media_str, read_time,
+        *_html_fields(title, category, excerpt), post_id
+    )
     
-    conn.commit()
-    conn.close()
+    conn = get_connection()
+    with _WRITE_LOCK:
+        if _HAS_RETURNING:
+            row = conn.execute(_SQL_UPDATE_RETURNING, params).fetchone()
+            return _row_to_post(row) if row else None
+        conn.execute(_SQL_UPDATE, params)
     
     return get_post_by_id(post_id)
 
@@ -299,9 +503,6 @@ def update_post(
 def delete_post(post_id: int) -> bool:
     """Delete a post by ID"""
     conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM posts WHERE id = ?', (post_id,))
-    deleted = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
-    return deleted
\ No newline at end of file
+    with _WRITE_LOCK:
+        cursor = conn.execute(_SQL_DELETE, (post_id,))
+    return cursor.rowcount > 0
@@ -1,16 +1,35 @@
-from fastapi import FastAPI, Form, UploadFile, File, HTTPException, Request
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi import FastAPI, Form, UploadFile, File, HTTPException, Request, Query
+from fastapi.responses import HTMLResponse, Response
 from fastapi.staticfiles import StaticFiles
-from typing import List, Optional
-import aiofiles
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.concurrency import run_in_threadpool
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
 from pathlib import Path
+import asyncio
+import os
 import uuid
+import hashlib
+import functools
+import multiprocessing
+import shutil
+import re
 import markdown2
+from markupsafe import Markup, escape
 
-from database import init_db, get_all_posts, get_post_by_id, get_latest_post, create_post, update_post
+from models import Post
+from database import (
+    init_db, get_posts_page, count_posts, get_post_by_id, get_latest_post, create_post, update_post
+)
 
 app = FastAPI(title="Neon Blog")
 
+# Pages and fragments repeat the same class names over and over, so they
+# shrink several times over; level 5 keeps the CPU cost per response low
+app.add_middleware(GZipMiddleware, minimum_size=500, compresslevel=5)
+
 # Markdown processor with extras
 MARKDOWN_EXTRAS = [
     "fenced-code-blocks",
@@ -22,17 +41,171 @@ MARKDOWN_EXTRAS = [
     "header-ids",
 ]
 
+# Documents this long bypass the render cache so they aren't pinned in memory
+MARKDOWN_CACHE_MAX_LENGTH = 200_000
+
+
+def _markdown_to_html(text: str) -> str:
+    return markdown2.markdown(text, extras=MARKDOWN_EXTRAS)
+
+
+_render_markdown_cached = functools.lru_cache(maxsize=256)(_markdown_to_html)
+
+
 def render_markdown(text: str) -> str:
-    """Convert markdown to HTML"""
+    """Convert markdown to HTML (memoized on the source text)"""
     if not text:
         return ""
-    return markdown2.markdown(text, extras=MARKDOWN_EXTRAS)
+    if len(text) < MARKDOWN_CACHE_MAX_LENGTH:
+        return _render_markdown_cached(text)
+    return _markdown_to_html(text)
+
+
+# The live preview renders blank-line separated blocks on their own, so on
+# each keystroke only the block being edited misses the cache
+_BLOCK_SPLIT_RE = re.compile(r'(\n(?:[ \t]*\n)+)')
+_FENCE_RE = re.compile(r'^[ \t]*(`{3,}|~{3,})(.*)$', re.M)
+_LIST_ITEM_RE = re.compile(r' {0,3}(?:[-*+]|\d+[.)])[ \t]')
+_LINK_DEFINITION_RE = re.compile(r'^ {0,3}\[[^\]]+\]:', re.M)
+_BLOCK_HTML_RE = re.compile(r'^ {0,3}</?(?:[A-Za-z]|!--)', re.M)
+_HEADER_ID_RE = re.compile(r'<h[1-6] id="([^"]*)"')
+
+# Blocks this long (a big fenced code block or list) render uncached: every
+# keystroke inside one would otherwise pin another copy of the whole block
+MARKDOWN_BLOCK_CACHE_MAX_LENGTH = 4_000
+
+_render_block_cached = functools.lru_cache(maxsize=4096)(_markdown_to_html)
+
+
+def _render_block(block: str) -> str:
+    """Render one preview block, memoized unless it is oversized"""
+    if len(block) < MARKDOWN_BLOCK_CACHE_MAX_LENGTH:
+        return _render_block_cached(block)
+    return _markdown_to_html(block)
+
+
+def _open_fence_after(block: str, fence: str) -> str:
+    """The code fence still open at the end of block ("" if none)"""
+    for marker, rest in _FENCE_RE.findall(block):
+        if not fence:
+            fence = marker
+        elif marker[0] == fence[0] and len(marker) >= len(fence) and not rest.strip():
+            # Only the same character, at least as long, closes a fence
+            fence = ""
+    return fence
+
+
+def _ends_in_list_item(block: str, in_list: bool) -> bool:
+    """Whether the last unindented line of block is a list item
+
+    Blank and indented lines belong to whatever came before them, so a
+    block made only of those keeps in_list from the block before it.
+    """
+    for line in reversed(block.split("\n")):
+        if line.strip() and not line.startswith(("    ", "\t")):
+            return bool(_LIST_ITEM_RE.match(line))
+    return in_list
+
+
+def _split_markdown_blocks(text: str) -> List[str]:
+    """Split markdown on blank lines into blocks that render independently"""
+    parts = _BLOCK_SPLIT_RE.split(text)
+    # Each block is kept as its list of parts and joined once at the end;
+    # appending to a joined string would copy it again for every part
+    blocks = [[parts[0]]]
+    open_fence = _open_fence_after(parts[0], "")
+    # Tracked per part rather than re-scanning the joined blocks[-1], so
+    # a long loose list still splits in linear time
+    in_list = _ends_in_list_item(parts[0], False)
+    for separator, block in zip(parts[1::2], parts[2::2]):
+        # Fenced code, indented continuations and runs of list items stay
+        # attached to the block before them, even when the list starts
+        # below a heading or paragraph in that block
+        if (open_fence or block[:1] in (' ', '\t')
+                or (in_list and _LIST_ITEM_RE.match(block))):
+            blocks[-1] += (separator, block)
+            in_list = _ends_in_list_item(block, in_list)
+        else:
+            blocks.append([block])
+            in_list = _ends_in_list_item(block, False)
+        open_fence = _open_fence_after(block, open_fence)
+    return ["".join(block_parts) for block_parts in blocks]
+
+
+def _needs_whole_render(text: str) -> bool:
+    """Whether text has markup that spans blank-line separated blocks"""
+    # Reference-style links resolve across blocks, and an HTML block may
+    # wrap markdown separated by blank lines
+    return bool(_LINK_DEFINITION_RE.search(text) or _BLOCK_HTML_RE.search(text))
+
+
+def render_markdown_preview(text: str) -> str:
+    """Render markdown for the live preview, re-rendering only changed blocks"""
+    if _needs_whole_render(text):
+        return render_markdown(text)
+    html = "\n".join(
+        _render_block(block) for block in _split_markdown_blocks(text) if block.strip()
+    )
+    # Heading ids are only numbered (intro, intro-2) within one render, so
+    # a repeated id means the blocks have to be rendered together
+    header_ids = _HEADER_ID_RE.findall(html)
+    if len(header_ids) != len(set(header_ids)):
+        return render_markdown(text)
+    return html
+
+
+# Documents at least this long are rendered whole in a worker process, so
+# the parse doesn't hold the GIL while other requests wait
+MARKDOWN_PROCESS_MIN_LENGTH = 20_000
+
+# A partial of markdown2 itself pickles without importing this module in
+# the workers
+_markdown_worker = functools.partial(markdown2.markdown, extras=MARKDOWN_EXTRAS)
+_markdown_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _new_markdown_pool() -> ProcessPoolExecutor:
+    """Start the worker pool for large markdown renders"""
+    # Spawned rather than forked: the server already has threads running
+    return ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn"))
+
+
+async def render_markdown_async(text: str, preview: bool = False) -> str:
+    """Render markdown (or the live preview) from an async handler"""
+    global _markdown_pool
+    # The preview only renders whole when it has markup spanning blocks;
+    # otherwise it just re-renders the changed blocks, which stays cheap
+    whole = not preview or _needs_whole_render(text)
+    if _markdown_pool is not None and whole and len(text) >= MARKDOWN_PROCESS_MIN_LENGTH:
+        pool = _markdown_pool
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(pool, _markdown_worker, text)
+        except BrokenProcessPool:
+            # A worker died (OOM kill or crash) and took the pool with it;
+            # start a fresh one, unless a concurrent request already has,
+            # and render this document in a thread instead
+            if _markdown_pool is pool:
+                pool.shutdown(wait=False, cancel_futures=True)
+                _markdown_pool = _new_markdown_pool()
+            return await run_in_threadpool(render_markdown, text)
+    return await run_in_threadpool(render_markdown_preview if preview else render_markdown, text)
 
 
 # Initialize database on startup
 @app.on_event("startup")
 def startup():
-    init_db()
+    global _markdown_pool
+    init_db(render_markdown)
+    _markdown_pool = _new_markdown_pool()
+
+
+@app.on_event("shutdown")
+def shutdown():
+    global _markdown_pool
+    if _markdown_pool is not None:
+        _markdown_pool.shutdown(cancel_futures=True)
+        _markdown_pool = None
 
 
 # Create upload directories
@@ -41,55 +214,207 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 (UPLOAD_DIR / "images").mkdir(exist_ok=True)
 (UPLOAD_DIR / "videos").mkdir(exist_ok=True)
 
-STATIC_DIR = Path(__file__).parent
+# Uploads are streamed to disk in chunks of this size, never read whole
+UPLOAD_CHUNK_SIZE = 64 * 1024
 
-# Mount uploads
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
+def _sendfile(src_fd: int, dst_fd: int) -> None:
+    """Copy a whole file between descriptors inside the kernel"""
+    size = os.fstat(src_fd).st_size
+    offset = 0
+    while offset < size:
+        sent = os.sendfile(dst_fd, src_fd, offset, size - offset)
+        if not sent:
+            break
+        offset += sent
+
+
+def _copy_upload(src, file_path: Path) -> None:
+    """Copy an upload's spooled temp file to file_path"""
+    src.seek(0)
+    with file_path.open('wb') as dst:
+        # Once the spooled file has rolled over to disk (the same check
+        # Starlette makes) it has a real descriptor, so the bytes never
+        # need to pass through Python
+        if hasattr(os, 'sendfile') and getattr(src, '_rolled', True):
+            try:
+                _sendfile(src.fileno(), dst.fileno())
+                return
+            except OSError:
+                # e.g. platforms where sendfile only writes to sockets
+                dst.seek(0)
+                dst.truncate()
+        shutil.copyfileobj(src, dst, UPLOAD_CHUNK_SIZE)
+
+
+async def _save_upload_file(file: UploadFile) -> Optional[str]:
+    """Save an uploaded image or video, returning its path (None if skipped)"""
+    if not file.filename:
+        return None
+
+    file_ext = Path(file.filename).suffix.lower()
+    unique_filename = f"{uuid.uuid4()}{file_ext}"
+
+    if file.content_type and file.content_type.startswith('image/'):
+        file_path = UPLOAD_DIR / "images" / unique_filename
+    elif file.content_type and file.content_type.startswith('video/'):
+        file_path = UPLOAD_DIR / "videos" / unique_filename
+    else:
+        return None
+
+    # The whole copy runs in a single threadpool call
+    await run_in_threadpool(_copy_upload, file.file, file_path)
+
+    return str(file_path)
 
-# Serve static files
-@app.get("/styles.css", response_class=FileResponse)
-async def serve_css():
-    return FileResponse(STATIC_DIR / "styles.css")
 
+async def _save_upload_files(media: List[UploadFile]) -> List[str]:
+    """Save all uploads concurrently, returning the saved paths in upload order"""
+    saved_paths = await asyncio.gather(*(_save_upload_file(file) for file in media))
+    return [path for path in saved_paths if path]
 
-@app.get("/favicon.ico", response_class=FileResponse)
-async def serve_favicon():
-    favicon_path = STATIC_DIR / "favicon.ico"
-    if favicon_path.exists():
-        return FileResponse(favicon_path)
-    raise HTTPException(status_code=404, detail="Favicon not found")
+STATIC_DIR = Path(__file__).parent / "static"
+
+# Content hash appended to the stylesheet URL, so it can be cached forever
+STYLES_VERSION = hashlib.sha256((STATIC_DIR / "styles.css").read_bytes()).hexdigest()[:12]
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that sets Cache-Control on every asset"""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if scope.get("query_string"):
+            # Versioned URL (?v=<hash>): the content behind it never changes
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = "public, max-age=86400"
+        return response
+
+
+# Mount uploads and static assets
+app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.mount("/static", CachedStaticFiles(directory=STATIC_DIR, follow_symlink=False), name="static")
 
 
 # ============================================
 # BASE HTML TEMPLATE HELPER
 # ============================================
-def base_html(title: str, content: str, include_htmx: bool = True) -> str:
-    """Generate base HTML wrapper"""
-    htmx_script = '<script src="https://unpkg.com/htmx.org@1.9.10"></script>' if include_htmx else ''
-    
-    return f'''<!DOCTYPE html>
+HTMX_SCRIPT = '<script src="https://unpkg.com/htmx.org@1.9.10"></script>'
+
+
+def _page_shell(htmx_script: str) -> Tuple[str, str, str]:
+    """Build the invariant page wrapper, split around the title and content"""
+    head = '''<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
-    <link rel="icon" href="/favicon.ico" type="image/x-icon">
-    <link rel="stylesheet" href="/styles.css">
+    <title>'''
+    mid = f'''</title>
+    <link rel="icon" href="/static/favicon.ico" type="image/x-icon">
+    <link rel="stylesheet" href="/static/styles.css?v={STYLES_VERSION}">
     {htmx_script}
 </head>
 <body>
-    {content}
+    '''
+    tail = '''
 </body>
 </html>'''
+    return head, mid, tail
+
+
+# Built once at import; base_html only joins the per-page parts in between,
+# with no template to parse on each call
+_SHELL_HTMX = _page_shell(HTMX_SCRIPT)
+_SHELL_NONE = _page_shell('')
+
+
+def base_html(title: str, content: str, include_htmx: bool = True) -> str:
+    """Generate base HTML wrapper"""
+    head, mid, tail = _SHELL_HTMX if include_htmx else _SHELL_NONE
+    return "".join((head, escape(title), mid, content, tail))
+
+
+def _etag(html: str) -> str:
+    """Weak ETag for a rendered page"""
+    # Weak because GZipMiddleware sends gzip and identity bodies under the
+    # same tag, and a strong validator must differ between encodings
+    return f'W/"{hashlib.blake2b(html.encode(), digest_size=16).hexdigest()}"'
+
+
+def _html_with_etag(request: Request, html: str, etag: Optional[str] = None) -> Response:
+    """Send a page with an ETag, or a bodiless 304 if the client already has it"""
+    etag = etag or _etag(html)
+    # no-cache still lets the browser store the page, but it revalidates on
+    # every view, so an edit shows up as soon as it is saved
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    opaque_tag = etag.removeprefix("W/")
+    if if_none_match and opaque_tag in (
+        tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+    ):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(content=html, headers=headers)
 
 
 # ============================================
 # MARKDOWN EDITOR ROUTES
 # ============================================
 
+# Choices offered by the editor's select boxes
+CATEGORIES = ("technology", "design", "tutorial", "opinion", "news", "tips", "tools", "showcase")
+COLORS = (
+    ("neon-pink", "Pink"),
+    ("neon-cyan", "Cyan"),
+    ("neon-purple", "Purple"),
+    ("neon-green", "Green"),
+    ("neon-orange", "Orange"),
+    ("neon-yellow", "Yellow"),
+)
+SIZES = (
+    ("bento-small", "Small"),
+    ("bento-medium", "Medium"),
+    ("bento-large", "Large"),
+    ("bento-tall", "Tall"),
+    ("bento-wide", "Wide"),
+)
+
+
+COLOR_VALUES = frozenset(val for val, _ in COLORS)
+SIZE_VALUES = frozenset(val for val, _ in SIZES)
+
+
+def _check_card_style(color: str, size: str) -> None:
+    """Reject a color or size that isn't one of the offered choices"""
+    # Both end up inside a class attribute, so free-form values are refused
+    if color not in COLOR_VALUES:
+        raise HTTPException(status_code=422, detail="Unknown color")
+    if size not in SIZE_VALUES:
+        raise HTTPException(status_code=422, detail="Unknown size")
+
+
+def _options_html(choices, selected: str) -> str:
+    """Render <option> tags for (value, label) choices"""
+    return "\n".join([
+        f'<option value="{val}" {"selected" if val == selected else ""}>{name}</option>'
+        for val, name in choices
+    ])
+
+
+def _options_by_selection(choices) -> dict:
+    """Prerender the option block for each possible selection ("" = none)"""
+    return {selected: _options_html(choices, selected) for selected in ("", *(val for val, _ in choices))}
+
+
+CATEGORY_OPTIONS = _options_by_selection([(cat, cat.title()) for cat in CATEGORIES])
+COLOR_OPTIONS = _options_by_selection(COLORS)
+SIZE_OPTIONS = _options_by_selection(SIZES)
+
+
 @app.get("/editor", response_class=HTMLResponse)
-async def editor_page(post_id: Optional[int] = None):
+def editor_page(post_id: Optional[int] = None):
     """Markdown editor page - create new or edit existing"""
     
     # If editing existing post, load its content
@@ -107,50 +432,22 @@ async def editor_page(post_id: Optional[int] = None):
     if post_id:
         post = get_post_by_id(post_id)
         if post:
-            initial_content = post.content
-            initial_title = post.title
+            # Edit the markdown source; HTML-only posts fall back to their HTML
+            initial_content = post.markdown_content or post.content
+            initial_title = Markup(post.title_html)
             initial_category = post.category.lower()
             initial_color = post.color
             initial_size = post.size
-            initial_excerpt = post.excerpt
+            initial_excerpt = Markup(post.excerpt_html)
             form_action = f"/posts/{post_id}/update-markdown"
             form_method = "hx-put"
             submit_text = "Update Post"
-            page_title = f"Edit: {post.title}"
+            page_title = Markup(f"Edit: {post.title_html}")
     
-    # Category options
-    categories = ["technology", "design", "tutorial", "opinion", "news", "tips", "tools", "showcase"]
-    category_options = "\n".join([
-        f'<option value="{cat}" {"selected" if cat == initial_category else ""}>{cat.title()}</option>'
-        for cat in categories
-    ])
-    
-    # Color options
-    colors = [
-        ("neon-pink", "Pink"),
-        ("neon-cyan", "Cyan"),
-        ("neon-purple", "Purple"),
-        ("neon-green", "Green"),
-        ("neon-orange", "Orange"),
-        ("neon-yellow", "Yellow"),
-    ]
-    color_options = "\n".join([
-        f'<option value="{val}" {"selected" if val == initial_color else ""}>{name}</option>'
-        for val, name in colors
-    ])
-    
-    # Size options
-    sizes = [
-        ("bento-small", "Small"),
-        ("bento-medium", "Medium"),
-        ("bento-large", "Large"),
-        ("bento-tall", "Tall"),
-        ("bento-wide", "Wide"),
-    ]
-    size_options = "\n".join([
-        f'<option value="{val}" {"selected" if val == initial_size else ""}>{name}</option>'
-        for val, name in sizes
-    ])
+    # Unknown values (e.g. a custom category) fall back to no selection
+    category_options = CATEGORY_OPTIONS.get(initial_category, CATEGORY_OPTIONS[""])
+    color_options = COLOR_OPTIONS.get(initial_color, COLOR_OPTIONS[""])
+    size_options = SIZE_OPTIONS.get(initial_size, SIZE_OPTIONS[""])
     
     content = f'''
     <header class="latest-header">
@@ -163,7 +460,7 @@ async def editor_page(post_id: Optional[int] = None):
     <main class="editor-container">
         <div class="editor-header">
             <h1 class="editor-title">
-                <span class="neon-text">✎</span> {page_title}
+                <span class="neon-text">✎</span> {escape(page_title)}
             </h1>
             <p class="editor-subtitle">Write in Markdown, see live preview</p>
         </div>
@@ -179,7 +476,7 @@ async def editor_page(post_id: Optional[int] = None):
                 <div class="setting-group">
                     <label for="title">Title</label>
                     <input type="text" id="title" name="title" 
-                           value="{initial_title}"
+                           value="{escape(initial_title)}"
                            placeholder="Post title..." required>
                 </div>
                 
@@ -210,7 +507,7 @@ async def editor_page(post_id: Optional[int] = None):
             <div class="editor-excerpt">
                 <label for="excerpt">Excerpt (optional)</label>
                 <input type="text" id="excerpt" name="excerpt" 
-                       value="{initial_excerpt}"
+                       value="{escape(initial_excerpt)}"
                        placeholder="Brief description for post cards...">
             </div>
 
@@ -228,10 +525,11 @@ async def editor_page(post_id: Optional[int] = None):
                         placeholder="# Start writing..."
                     hx-post="/preview"
                     hx-trigger="keyup changed delay:400ms"
+                    hx-sync="this:replace"
                     hx-target="#preview-content"
                     hx-swap="innerHTML"
                     required
-                >{initial_content}</textarea>
+                >{escape(initial_content)}</textarea>
             </div>
 
             <!-- Right: Live Preview -->
@@ -275,7 +573,9 @@ async def preview_markdown(content: str = Form("")):
             content='<p class="preview-placeholder">Start typing to see preview...</p>'
         )
 
-    html_content = render_markdown(content)
+    # Rendering is CPU-bound, so keep it off the event loop; hx-sync on the
+    # textarea aborts a still-pending preview when a newer one is sent
+    html_content = await render_markdown_async(content, preview=True)
     return HTMLResponse(content=html_content)
 
 @app.post("/posts/create-markdown", response_class=HTMLResponse)
@@ -289,31 +589,17 @@ content: str = Form(...),
 media: List[UploadFile] = File(default=[])
 ):
     """Create a new post from markdown content"""
+    _check_card_style(color, size)
+
     # Handle file uploads
-    media_files = []
-    for file in media:
-        if file.filename:
-            file_ext = Path(file.filename).suffix.lower()
-            unique_filename = f"{uuid.uuid4()}{file_ext}"
-            
-            if file.content_type and file.content_type.startswith('image/'):
-                file_path = UPLOAD_DIR / "images" / unique_filename
-            elif file.content_type and file.content_type.startswith('video/'):
-                file_path = UPLOAD_DIR / "videos" / unique_filename
-            else:
-                continue
-            
-            async with aiofiles.open(file_path, 'wb') as f:
-                file_content = await file.read()
-                await f.write(file_content)
-            
-            media_files.append(str(file_path))
+    media_files = await _save_upload_files(media)
 
     # Convert markdown to HTML for storage
-    html_content = render_markdown(content)
+    html_content = await render_markdown_async(content)
 
     # Create post in database
-    new_post = create_post(
+    new_post = await run_in_threadpool(
+        create_post,
         title=title,
         category=category,
         color=color,
@@ -324,11 +610,12 @@ media: List[UploadFile] = File(default=[])
         markdown_content=content  # Store original markdown
     )
 
-    # Redirect to homepage (full page reload via htmx)
+    # Send the editor to the homepage; HX-Location has htmx fetch it and
+    # swap it into the body, instead of HX-Redirect's full page reload
     return HTMLResponse(
         content="",
         status_code=200,
-        headers={"HX-Redirect": "/"}
+        headers={"HX-Location": "/"}
     )
 
 @app.put("/posts/{post_id}/update-markdown", response_class=HTMLResponse)
@@ -343,36 +630,25 @@ content: str = Form(...),
 media: List[UploadFile] = File(default=[])
 ):
     """Update an existing post with markdown content"""
+    _check_card_style(color, size)
 
-    post = get_post_by_id(post_id)
+    post = await run_in_threadpool(get_post_by_id, post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    # Handle new file uploads
-    media_files = post.get_media_list()  # Keep existing media
-    for file in media:
-        if file.filename:
-            file_ext = Path(file.filename).suffix.lower()
-            unique_filename = f"{uuid.uuid4()}{file_ext}"
-            
-            if file.content_type and file.content_type.startswith('image/'):
-                file_path = UPLOAD_DIR / "images" / unique_filename
-            elif file.content_type and file.content_type.startswith('video/'):
-                file_path = UPLOAD_DIR / "videos" / unique_filename
-            else:
-                continue
-            
-            async with aiofiles.open(file_path, 'wb') as f:
-                file_content = await file.read()
-                await f.write(file_content)
-            
-            media_files.append(str(file_path))
+    # Handle new file uploads, keeping existing media
+    media_files = post.media_files + await _save_upload_files(media)
 
-    # Convert markdown to HTML
-    html_content = render_markdown(content)
+    # Convert markdown to HTML, unless only the metadata changed; content
+    # already holds the HTML rendered from markdown_content
+    if post.has_markdown() and content == post.markdown_content:
+        html_content = post.content
+    else:
+        html_content = await render_markdown_async(content)
 
     # Update post
-    update_post(
+    await run_in_threadpool(
+        update_post,
         post_id=post_id,
         title=title,
         category=category,
@@ -384,37 +660,69 @@ media: List[UploadFile] = File(default=[])
         markdown_content=content
     )
 
+    # The next view re-renders the page from the updated row
+    _post_page_cache.pop(post_id, None)
+
     return HTMLResponse(
         content="",
         status_code=200,
-        headers={"HX-Redirect": f"/posts/{post_id}"}
+        headers={"HX-Location": f"/posts/{post_id}"}
     )
 
+POSTS_PER_PAGE = 20
+
+
 @app.get("/", response_class=HTMLResponse)
-async def homepage():
-    posts = get_all_posts()
-    latest = get_latest_post()
+def homepage(
+    request: Request,
+    before: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    limit: int = Query(POSTS_PER_PAGE, ge=1, le=100)
+):
+    posts = get_posts_page(before, before_id, limit)
+    # Without a full cursor get_posts_page returns the first page
+    first_page = before is None or before_id is None
+    # The first page is already newest-first, so it holds the latest post;
+    # older pages still need the extra lookup
+    if first_page:
+        latest = posts[0] if posts else None
+    else:
+        latest = get_latest_post()
 
     # Build post cards HTML
-    cards_html = ""
+    card_parts = []
     for post in posts:
-        excerpt_html = f'<p class="post-excerpt">{post.excerpt}</p>' if post.excerpt else ''
-        cards_html += f'''
-        <article class="bento-item {post.size} {post.color}">
+        excerpt_html = f'<p class="post-excerpt">{post.excerpt_html}</p>' if post.excerpt else ''
+        card_parts.append(f'''
+        <article class="bento-item {escape(post.size)} {escape(post.color)}">
             <a href="/posts/{post.id}" class="post-link">
-                <div class="post-category">{post.category}</div>
-                <h2>{post.title}</h2>
+                <div class="post-category">{post.category_html}</div>
+                <h2>{post.title_html}</h2>
                 {excerpt_html}
                 <div class="post-meta">
-                    <span>{post.formatted_date()}</span>
+                    <span>{post.formatted_date}</span>
                     <span>•</span>
                     <span>{post.read_time}</span>
                 </div>
             </a>
         </article>
-        '''
-
-    latest_title = latest.title if latest else "Welcome to Neon Blog"
+        ''')
+    cards_html = "".join(card_parts)
+
+    # Pagination: back to the first page, and on to older posts if this page is full
+    pagination_html = ''
+    if not first_page or len(posts) == limit:
+        newer_link = '<span></span>' if first_page else '<a href="/" class="back-link">← Newest posts</a>'
+        older_link = ''
+        if len(posts) == limit:
+            last = posts[-1]
+            older_link = (
+                f'<a href="/?before={last.created_at.isoformat()}&amp;before_id={last.id}&amp;limit={limit}" '
+                f'class="edit-link">Older posts →</a>'
+            )
+        pagination_html = f'<nav class="post-nav">{newer_link}{older_link}</nav>'
+
+    latest_title = latest.title_html if latest else "Welcome to Neon Blog"
     latest_id = latest.id if latest else 1
 
     content = f'''
@@ -429,6 +737,7 @@ async def homepage():
         <section class="bento-grid" id="posts-grid">
             {cards_html}
         </section>
+        {pagination_html}
 
         <!-- Quick Actions -->
         <section class="quick-actions">
@@ -530,26 +839,62 @@ async def homepage():
     </main>
     '''
 
-    return HTMLResponse(content=base_html("Neon Blog", content))
+    return _html_with_etag(request, base_html("Neon Blog", content))
+
+
+_IMAGE_TAG = '<img src="/{0}" alt="Post media">'
+_VIDEO_TAG = '<video src="/{0}" controls></video>'
+
+# Media file extension -> tag template for the post page
+MEDIA_TAGS = {
+    '.jpg': _IMAGE_TAG,
+    '.jpeg': _IMAGE_TAG,
+    '.png': _IMAGE_TAG,
+    '.gif': _IMAGE_TAG,
+    '.webp': _IMAGE_TAG,
+    '.mp4': _VIDEO_TAG,
+    '.webm': _VIDEO_TAG,
+    '.ogg': _VIDEO_TAG,
+}
+
+
+# Rendered post pages by id, each stored with the Post it was built from and
+# the page's ETag
+_post_page_cache: Dict[int, Tuple[Post, str, str]] = {}
+
 
 @app.get("/posts/{post_id}", response_class=HTMLResponse)
-async def get_post_page(post_id: int):
+def get_post_page(request: Request, post_id: int):
     post = get_post_by_id(post_id)
 
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
+    # Reuse the rendered page while the stored post is unchanged. The whole
+    # row is compared rather than updated_at, whose CURRENT_TIMESTAMP value
+    # only has one-second resolution.
+    cached = _post_page_cache.get(post_id)
+    if cached and cached[0] == post:
+        return _html_with_etag(request, cached[1], cached[2])
+
+    page = _render_post_page(post)
+    etag = _etag(page)
+    _post_page_cache[post_id] = (post, page, etag)
+    return _html_with_etag(request, page, etag)
+
+
+def _render_post_page(post: Post) -> str:
+    """Render the full HTML page for a single post"""
     # Build media HTML
     media_html = ""
-    media_list = post.get_media_list()
-    if media_list:
-        media_html = '<div class="post-media">'
-        for media_file in media_list:
-            if media_file.endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp')):
-                media_html += f'<img src="/{media_file}" alt="Post media">'
-            elif media_file.endswith(('.mp4', '.webm', '.ogg')):
-                media_html += f'<video src="/{media_file}" controls></video>'
-        media_html += '</div>'
+    if post.media_files:
+        media_html_parts = ['<div class="post-media">']
+        for media_file in post.media_files:
+            tag = MEDIA_TAGS.get(Path(media_file).suffix.lower())
+            if tag:
+                media_html_parts.append(tag.format(media_file))
+        media_html_parts.append('</div>')
+        media_html = "".join(media_html_parts)
 
     content = f'''
     <header class="latest-header">
@@ -566,10 +911,10 @@ async def get_post_page(post_id: int):
         </div>
         
         <article class="post-full">
-            <span class="post-category">{post.category}</span>
-            <h1>{post.title}</h1>
+            <span class="post-category">{post.category_html}</span>
+            <h1>{post.title_html}</h1>
             <div class="post-meta">
-                <span>Published {post.formatted_date_long()}</span>
+                <span>Published {post.formatted_date_long}</span>
                 <span>•</span>
                 <span>{post.read_time}</span>
             </div>
@@ -582,7 +927,7 @@ async def get_post_page(post_id: int):
     </main>
     '''
 
-    return HTMLResponse(content=base_html(f"{post.title} - Neon Blog", content))
+    return base_html(Markup(post.title_html) + " - Neon Blog", content)
 
 @app.post("/posts/create", response_class=HTMLResponse)
 async def create_new_post(
@@ -594,28 +939,14 @@ excerpt: str = Form(""),
 content: str = Form(...),
 media: List[UploadFile] = File(default=[])
 ):
+    _check_card_style(color, size)
+
     # Handle file uploads
-    media_files = []
-    for file in media:
-        if file.filename:
-            file_ext = Path(file.filename).suffix.lower()
-            unique_filename = f"{uuid.uuid4()}{file_ext}"
-
-            if file.content_type and file.content_type.startswith('image/'):
-                file_path = UPLOAD_DIR / "images" / unique_filename
-            elif file.content_type and file.content_type.startswith('video/'):
-                file_path = UPLOAD_DIR / "videos" / unique_filename
-            else:
-                continue
-            
-            async with aiofiles.open(file_path, 'wb') as f:
-                file_content = await file.read()
-                await f.write(file_content)
-            
-            media_files.append(str(file_path))
+    media_files = await _save_upload_files(media)
 
     # Create post in database
-    new_post = create_post(
+    new_post = await run_in_threadpool(
+        create_post,
         title=title,
         category=category,
         color=color,
@@ -625,16 +956,16 @@ media: List[UploadFile] = File(default=[])
         media_files=media_files
     )
 
-    excerpt_html = f'<p class="post-excerpt">{new_post.excerpt}</p>' if new_post.excerpt else ''
+    excerpt_html = f'<p class="post-excerpt">{new_post.excerpt_html}</p>' if new_post.excerpt else ''
 
     return HTMLResponse(content=f'''
-    <article class="bento-item {new_post.size} {new_post.color}">
+    <article class="bento-item {escape(new_post.size)} {escape(new_post.color)}">
         <a href="/posts/{new_post.id}" class="post-link">
-            <div class="post-category">{new_post.category}</div>
-            <h2>{new_post.title}</h2>
+            <div class="post-category">{new_post.category_html}</div>
+            <h2>{new_post.title_html}</h2>
             {excerpt_html}
             <div class="post-meta">
-                <span>{new_post.formatted_date()}</span>
+                <span>{new_post.formatted_date}</span>
                 <span>•</span>
                 <span>Just now</span>
             </div>
@@ -643,9 +974,8 @@ media: List[UploadFile] = File(default=[])
     ''')
 
 @app.get("/health")
-async def health_check():
-    posts = get_all_posts()
-    return {"status": "healthy", "posts_count": len(posts)}
+def health_check():
+    return {"status": "healthy", "posts_count": count_posts()}
 
     if name == "main":
         import uvicorn
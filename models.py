@@ -1,10 +1,10 @@
 from datetime import datetime
 from typing import Optional, List
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pydantic import BaseModel
 
 
-@dataclass
+@dataclass(slots=True)
 class Post:
     id: int
     title: str
@@ -13,22 +13,17 @@ class Post:
     size: str
     excerpt: str
     content: str  # HTML content (rendered)
-    media_files: str  # Stored as comma-separated string
     created_at: datetime
     read_time: str
     markdown_content: str = ""  # Original markdown (for editing)
-    
-    def get_media_list(self) -> List[str]:
-        """Convert comma-separated media string to list"""
-        if not self.media_files:
-            return []
-        return [f.strip() for f in self.media_files.split(',') if f.strip()]
-    
-    def formatted_date(self) -> str:
-        return self.created_at.strftime("%b %d, %Y")
-    
-    def formatted_date_long(self) -> str:
-        return self.created_at.strftime("%B %d, %Y")
+    # HTML-escaped copies of the user-supplied text, safe to emit as-is
+    title_html: str = ""
+    category_html: str = ""
+    excerpt_html: str = ""
+    # Display forms of created_at, computed once when the post is created
+    formatted_date: str = ""
+    formatted_date_long: str = ""
+    media_files: List[str] = field(default_factory=list)  # Stored as a JSON array
     
     def has_markdown(self) -> bool:
         """Check if post has markdown source"""